@@ -15,24 +15,50 @@ Otherwise run with an address like "123 Main St, Anytown, USA" as a positional a
 
 """
 
+import asyncio
+import contextlib
+import functools
+import gc
+import hashlib
+import os
 import sys
+from collections.abc import Callable, Mapping
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, Any, TypeVar
 
-import osmnx as ox
 from mcp.server.fastmcp import FastMCP
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
-from maps import generators
 from maps._compat import old_main, parse_args
-from maps.storage import R2Bucket
-from maps.types import (
+from maps.schemas import (
     Address,
+    Distance,
     GraphFromAddressOptions,
     GraphFromPointOptions,
     PlotOptions,
     Point,
 )
+from maps.storage import R2Bucket
+
+# osmnx, matplotlib and boto3 are imported on first use, so that the CLI (e.g.
+# --help) and listing the MCP tools don't wait seconds for them
+if TYPE_CHECKING:
+    from networkx import MultiDiGraph
+
+# headless server, never try to open a window
+os.environ.setdefault("MPLBACKEND", "Agg")
+
+# the fs inside the MCP server is read-only, so keep the http cache on tmpfs
+os.environ.setdefault("OSMNX_CACHE", "/tmp/osmnx")
+os.makedirs(os.environ["OSMNX_CACHE"], exist_ok=True)
+
+T = TypeVar("T")
+
+# downloads are network-bound, so run them off the event loop
+_EXECUTOR = ThreadPoolExecutor(max_workers=min(8, 2 * (os.cpu_count() or 1)))
 
-ox.settings.use_cache = False  # read-only fs inside MCP server # type: ignore
+# beyond this, a single overpass query is slower than fetching tiles concurrently
+TILED_DOWNLOAD_MIN_DIST = 3000
 
 mcp = FastMCP(
     "Street map generator",
@@ -46,7 +72,29 @@ mcp = FastMCP(
 
 
 def _make_url(key: str) -> str:
-    return f"{r2_bucket_settings.R2_PUBLIC_BUCKET_URL}/{key}"
+    return f"{_r2_bucket_settings().R2_PUBLIC_BUCKET_URL}/{key}"
+
+
+def _freeze(options: Mapping[str, Any]) -> tuple[tuple[str, Any], ...]:
+    return tuple(
+        sorted((k, tuple(v) if isinstance(v, list) else v) for k, v in options.items())
+    )
+
+
+def _from_address(address: Address, dist: int, **kwargs: Any) -> "MultiDiGraph":
+    from maps import generators
+
+    if dist > TILED_DOWNLOAD_MIN_DIST:
+        return generators.from_address_tiled(address, dist=dist, **kwargs)
+    return generators.from_address(address, dist=dist, **kwargs)
+
+
+def _from_point(point: Point, dist: int, **kwargs: Any) -> "MultiDiGraph":
+    from maps import generators
+
+    if dist > TILED_DOWNLOAD_MIN_DIST:
+        return generators.from_point_tiled(point, dist=dist, **kwargs)
+    return generators.from_point(point, dist=dist, **kwargs)
 
 
 class R2BucketSettings(BaseSettings):
@@ -59,61 +107,171 @@ class R2BucketSettings(BaseSettings):
     AWS_SECRET_ACCESS_KEY: str
 
 
-r2_bucket_settings = R2BucketSettings()  # type: ignore
+# built on first use, the legacy CLI doesn't need R2 credentials
+@functools.cache
+def _r2_bucket_settings() -> R2BucketSettings:
+    return R2BucketSettings()  # type: ignore
 
-r2_bucket = R2Bucket(
-    bucket_name=r2_bucket_settings.R2_BUCKET,
-    endpoint_url=r2_bucket_settings.R2_ENDPOINT_URL,
-    aws_access_key_id=r2_bucket_settings.AWS_ACCESS_KEY_ID,
-    aws_secret_access_key=r2_bucket_settings.AWS_SECRET_ACCESS_KEY,
-)
+
+@functools.cache
+def _r2_bucket() -> R2Bucket:
+    settings = _r2_bucket_settings()
+    return R2Bucket(
+        bucket_name=settings.R2_BUCKET,
+        endpoint_url=settings.R2_ENDPOINT_URL,
+        aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
+        aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
+    )
+
+
+def _digest(*args: Any) -> str:
+    return hashlib.blake2b(repr(args).encode(), digest_size=16).hexdigest()
+
+
+@functools.lru_cache(maxsize=256)
+def _existing_url(network_type: str, namespace: str, name: str) -> str:
+    """Return the url of an already uploaded map, raising LookupError if missing.
+
+    Misses raise so that lru_cache only remembers maps that exist. The first
+    call builds the bucket (and imports boto3), so keep this off the event loop.
+    """
+    from botocore.exceptions import ClientError
+
+    bucket = _r2_bucket()
+    key = bucket.figure_key(network_type, namespace, name)
+    try:
+        exists = bucket.exists(key)
+    except ClientError:
+        # e.g. a 403 or throttling, rendering the map again beats failing the call
+        exists = False
+    if not exists:
+        raise LookupError(key)
+    return _make_url(key)
+
+
+def _plot_and_save(
+    G: "MultiDiGraph",
+    network_type: str,
+    namespace: str,
+    plot_options: PlotOptions,
+    name: str,
+) -> str:
+    from maps import fast_render, plotting
+
+    if fast_render.supports(**plot_options):
+        image = fast_render.render_image(G, **plot_options)
+    else:
+        dpi = plot_options.get("dpi", 300)
+        image = plotting.renderer(**plot_options).render(G, dpi)
+    return _r2_bucket().save_image(image, network_type, namespace, name=name)
+
+
+def _fetch(
+    fetch: Callable[..., "MultiDiGraph"], location: Any, dist: int, **options: Any
+) -> "MultiDiGraph":
+    from maps import generators
+
+    misses = generators.cache_misses()
+    G = fetch(location, dist=dist, **options)
+    if generators.cache_misses() > misses:
+        # a fresh download, reclaim the overpass response buffers before rendering
+        gc.collect()
+    return G
+
+
+async def _run_in_executor(func: Callable[..., T], *args: Any) -> T:
+    return await asyncio.get_running_loop().run_in_executor(_EXECUTOR, func, *args)
+
+
+async def _plot_street_map(
+    fetch: Callable[..., "MultiDiGraph"],
+    location: Any,
+    dist: int,
+    options: Mapping[str, Any],
+    plot_options: PlotOptions,
+    namespace: str,
+) -> str:
+    network_type = options.get("network_type", "street")
+
+    # identical requests (e.g. retried tool calls) map to the same object in R2
+    name = _digest(location, dist, _freeze(options), _freeze(plot_options))
+    with contextlib.suppress(LookupError):
+        return await _run_in_executor(_existing_url, network_type, namespace, name)
+
+    # generators limit concurrent overpass downloads themselves, cache hits
+    # don't wait behind them
+    G = await _run_in_executor(
+        functools.partial(_fetch, fetch, location, dist, **options)
+    )
+    key = await _run_in_executor(
+        _plot_and_save, G, network_type, namespace, plot_options, name
+    )
+    return _make_url(key)
 
 
 @mcp.tool()
-def plot_street_map_from_address(
+async def plot_street_map_from_address(
     address: Address,
     address_options: GraphFromAddressOptions | None = None,
     plot_options: PlotOptions | None = None,
+    dist: Distance = 1000,
 ) -> str:
     """Generate a street map from an address.
 
     the resulting path should be shown to the user.
     """
-    address_options = address_options or {}
-    plot_options = plot_options or {"node_size": 1, "edge_linewidth": 0.5}
-    G = generators.from_address(address, **address_options)
-    fig, _ = ox.plot_graph(G, show=False, **plot_options)
-    key = r2_bucket.save_figure(
-        fig,
-        address_options.get("network_type", "street"),
+    return await _plot_street_map(
+        _from_address,
+        address,
+        dist,
+        address_options or {},
+        plot_options or {"node_size": 1, "edge_linewidth": 0.5},
         address.replace(",", "").replace(" ", "_"),
-        plot_options.get("dpi", 300),
     )
-    return _make_url(key)
 
 
 @mcp.tool()
-def plot_street_map_from_coordinates(
+async def plot_street_maps_from_addresses(
+    addresses: list[Address],
+    address_options: GraphFromAddressOptions | None = None,
+    plot_options: PlotOptions | None = None,
+    dist: Distance = 1000,
+) -> list[str]:
+    """Generate a street map for each of several addresses, concurrently.
+
+    the resulting paths should be shown to the user.
+    """
+    return list(
+        await asyncio.gather(
+            *(
+                plot_street_map_from_address(
+                    address, address_options, plot_options, dist
+                )
+                for address in addresses
+            )
+        )
+    )
+
+
+@mcp.tool()
+async def plot_street_map_from_coordinates(
     point: Point,
     point_options: GraphFromPointOptions | None = None,
     plot_options: PlotOptions | None = None,
+    dist: Distance = 1000,
 ) -> str:
     """Generate a street map from a point.
 
     the resulting path should be shown to the user.
     """
-    point_options = point_options or {}
-    plot_options = plot_options or {"node_size": 1, "edge_linewidth": 0.5}
-
-    G = generators.from_point(point, **point_options)
-    fig, _ = ox.plot_graph(G, show=False, **plot_options)
-    key = r2_bucket.save_figure(
-        fig,
-        point_options.get("network_type", "street"),
+    return await _plot_street_map(
+        _from_point,
+        point,
+        dist,
+        point_options or {},
+        plot_options or {"node_size": 1, "edge_linewidth": 0.5},
         "some_coordinate_point",
-        plot_options.get("dpi", 300),
     )
-    return _make_url(key)
 
 
 if __name__ == "__main__":
@@ -7,7 +7,7 @@ from datetime import datetime
 from pathlib import Path
 from typing import Literal
 
-import osmnx as ox
+from maps.types import PlotOptions
 
 
 def generate_street_map_from_address(
@@ -27,35 +27,49 @@ def generate_street_map_from_address(
 
     https://bsky.app/profile/did:plc:xbtmt2zjwlrfegqvch7fboei/post/3ljvxn7dy3c2l
     """
-    import matplotlib.pyplot as plt
+    # imported here so parsing args (e.g. --help) doesn't wait on osmnx/matplotlib
+    import osmnx as ox
 
-    print(f"Downloading street network for {address} (type: {network_type})...")
-    graph = ox.graph_from_address(address, network_type=network_type, dist=dist)
-    graph_proj = ox.project_graph(graph)  # type: ignore
+    from maps import generators, plotting
 
-    print("Generating map visualization...")
-    fig, _ = ox.plot_graph(
-        graph_proj,
-        figsize=figsize,
-        node_size=node_size,
-        edge_linewidth=edge_linewidth,
-        bgcolor=bgcolor,
-        edge_color=edge_color,
-        show=False,
-        close=False,
+    print(f"Downloading street network for {address} (type: {network_type})...")
+    graph = ox.graph_from_point(
+        generators.geocode(address), network_type=network_type, dist=dist
     )
+    # no need to project to UTM just to draw it, both plotting.plot_graph (via the
+    # equirectangular frame of generators.to_soa) and ox.plot_graph correct the
+    # aspect ratio of unprojected graphs for their latitude
+
+    plot_options: PlotOptions = {
+        "figsize": figsize,
+        "node_size": node_size,
+        "edge_linewidth": edge_linewidth,
+        "bgcolor": bgcolor,
+        "edge_color": edge_color,
+    }
 
-    if save_path:
-        Path(save_path).parent.mkdir(parents=True, exist_ok=True)
-        print(f"Saving map to {save_path}...")
-        fig.savefig(save_path, dpi=dpi, bbox_inches="tight")
-        plt.close()
-    else:
+    if not save_path:
         print("Displaying map...")
-        plt.show()
+        ox.plot_graph(graph, show=True, **plot_options)
+        return
 
+    # ox.plot_graph draws the canvas once itself before savefig draws it again,
+    # plotting our own figure leaves savefig's draw as the only one
+    print("Generating map visualization...")
+    fig, _ = plotting.plot_graph(graph, **plot_options)
 
-def parse_args() -> argparse.Namespace:
+    Path(save_path).parent.mkdir(parents=True, exist_ok=True)
+    print(f"Saving map to {save_path}...")
+    save_kwargs = {}
+    if Path(save_path).suffix.lower() == ".png":
+        # the cheapest deflate level barely loses size on flat map images
+        save_kwargs["pil_kwargs"] = {"compress_level": 1, "optimize": False}
+    fig.savefig(
+        save_path, dpi=dpi, bbox_inches=plotting.axes_extent(fig), **save_kwargs
+    )
+
+
+def _build_parser() -> argparse.ArgumentParser:
     parser = argparse.ArgumentParser(
         description="Generate street network maps using OSMnx",
         formatter_class=argparse.ArgumentDefaultsHelpFormatter,
@@ -118,7 +132,14 @@ def parse_args() -> argparse.Namespace:
         type=str,
         help="Output file path (defaults to street_map_TIMESTAMP.png)",
     )
-    return parser.parse_args()
+    return parser
+
+
+_PARSER = _build_parser()
+
+
+def parse_args() -> argparse.Namespace:
+    return _PARSER.parse_args()
 
 
 def old_main(args: argparse.Namespace):
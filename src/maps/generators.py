@@ -1,9 +1,33 @@
 """Graph generators for different data sources."""
 
-from typing import Unpack
+import functools
+import inspect
+import json
+import math
+import os
+import re
+import shelve
+import threading
+import time
+import types
+import weakref
+from collections.abc import Callable, Hashable, Sequence
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, ParamSpec, TypeVar, Unpack
 
+import networkx as nx
+import numpy as np
 import osmnx as ox
+import shapely
 from networkx import MultiDiGraph
+from osmnx import _http as ox_http
+from osmnx._errors import InsufficientResponseError, ResponseStatusCodeError
+
+try:  # optional, parses cached overpass responses several times faster
+    import orjson
+except ImportError:
+    orjson = None
 
 from maps.types import (
     Address,
@@ -14,7 +38,171 @@ from maps.types import (
     Point,
 )
 
+ox.settings.use_cache = True
+ox.settings.cache_folder = os.path.expanduser(
+    os.environ.get("OSMNX_CACHE", "~/.cache/osmnx")
+)
+
+
+def _orjson_namespace() -> types.SimpleNamespace:
+    """Return a stand-in for the `json` module that parses with orjson."""
+    public = {k: v for k, v in vars(json).items() if not k.startswith("_")}
+    return types.SimpleNamespace(**{**public, "loads": orjson.loads})
+
+
+if orjson is not None:
+    # osmnx reads its http cache through its module's `json`, hand it a copy
+    # that parses with orjson so the rest of the process keeps the stdlib
+    ox_http.json = _orjson_namespace()
+
+P = ParamSpec("P")
+T = TypeVar("T")
+
+# overpass hands out a handful of slots per IP, more concurrency just queues.
+# this is the process-wide limit, taken around downloads only, never cache hits
+_OVERPASS_SEMAPHORE = threading.Semaphore(4)
+_RETRY_DELAYS = (1, 2, 4)
+_STATUS_CODE = re.compile(r"responded: (\d{3}) ")
+
+# tiles are cut from one grid shared by every request, so a tile is always
+# queried (and cached) with the same bounds whichever map it's part of
+TILE_METERS = 2000
+METERS_PER_DEGREE = 111_320
+
+_GEOCODE_DB_LOCK = threading.Lock()
+_THREAD_STATE = threading.local()
+_SOA_CACHE: weakref.WeakKeyDictionary[MultiDiGraph, dict[str, np.ndarray]] = (
+    weakref.WeakKeyDictionary()
+)
+_NODE_COORDS_CACHE: weakref.WeakKeyDictionary[
+    MultiDiGraph, tuple[np.ndarray, np.ndarray, np.ndarray]
+] = weakref.WeakKeyDictionary()
+
+
+def _freeze(value: Any) -> Hashable:
+    """Normalize a value into a hashable cache key.
+
+    Floats are rounded to 5 decimals (~1 m in degrees) so nearby points share
+    a key.
+    """
+    if isinstance(value, dict):
+        return tuple(sorted((k, _freeze(v)) for k, v in value.items()))
+    if isinstance(value, list | tuple):
+        return tuple(_freeze(v) for v in value)
+    if isinstance(value, float):
+        return round(value, 5)
+    return value
+
+
+class _CallKey:
+    """The arguments of a call, hashed and compared by their normalized form."""
+
+    __slots__ = ("args", "kwargs", "_frozen", "_hash")
+
+    def __init__(self, bound: inspect.BoundArguments) -> None:
+        self.args, self.kwargs = bound.args, bound.kwargs
+        self._frozen = _freeze(bound.arguments)
+        self._hash = hash(self._frozen)
+
+    def __eq__(self, other: object) -> bool:
+        return isinstance(other, _CallKey) and self._frozen == other._frozen
+
+    def __hash__(self) -> int:
+        return self._hash
+
+
+def _memoize(
+    func: Callable[P, MultiDiGraph],
+) -> Callable[P, MultiDiGraph]:
+    """Memoize a graph generator on its normalized arguments.
+
+    Unlike a bare `functools.lru_cache`, unhashable options (lists, dicts) are
+    accepted and equivalent calls share an entry. Cached graphs are shared
+    between callers, so they must not be mutated.
+    """
+    signature = inspect.signature(func)
+
+    @functools.lru_cache(maxsize=128)
+    def cached(key: _CallKey) -> MultiDiGraph:
+        _THREAD_STATE.misses = cache_misses() + 1
+        return func(*key.args, **key.kwargs)
+
+    @functools.wraps(func)
+    def wrapper(*args: P.args, **kwargs: P.kwargs) -> MultiDiGraph:
+        bound = signature.bind(*args, **kwargs)
+        bound.apply_defaults()
+        return cached(_CallKey(bound))
+
+    wrapper.cache_clear = cached.cache_clear  # type: ignore[attr-defined]
+    return wrapper
+
+
+def cache_misses() -> int:
+    """Count the memoized generator calls that missed the cache in this thread.
+
+    Compare the count before and after a call to tell whether it built a graph
+    (e.g. downloaded it) or returned a cached one.
+    """
+    return getattr(_THREAD_STATE, "misses", 0)
+
+
+def _with_overpass_slot(func: Callable[P, T], *args: P.args, **kwargs: P.kwargs) -> T:
+    """Call `func` while holding an overpass slot, backing off when rate limited.
+
+    osmnx already waits out some 429s on its own, this also retries the other
+    rate limit and server errors it raises. Anything else (e.g. a 400 from a
+    bad `custom_filter`) won't go away by waiting and is raised right away.
+    """
+    for delay in _RETRY_DELAYS:
+        try:
+            with _OVERPASS_SEMAPHORE:
+                return func(*args, **kwargs)
+        except ResponseStatusCodeError as e:
+            if not _is_transient(e):
+                raise
+            time.sleep(delay)
+
+    with _OVERPASS_SEMAPHORE:
+        return func(*args, **kwargs)
+
+
+def _is_transient(error: ResponseStatusCodeError) -> bool:
+    # osmnx only puts the status code in the message
+    match = _STATUS_CODE.search(str(error))
+    return match is not None and (match[1] == "429" or match[1].startswith("5"))
+
+
+@functools.lru_cache(maxsize=512)
+def geocode(address: Address) -> Point:
+    """Geocode an address, memoized in process and on disk.
+
+    Results are persisted in a shelve inside the OSMnx cache folder so that
+    they survive restarts, and each address only hits Nominatim once.
+
+    Args:
+        address: The address to geocode
 
+    Returns:
+        (latitude, longitude) tuple
+    """
+    if not ox.settings.use_cache:
+        return ox.geocoder.geocode(address)
+
+    cache_folder = Path(ox.settings.cache_folder)
+    cache_folder.mkdir(parents=True, exist_ok=True)
+    db_path = str(cache_folder / "geocode.db")
+
+    with _GEOCODE_DB_LOCK, shelve.open(db_path) as db:
+        if address in db:
+            return db[address]
+
+    point = ox.geocoder.geocode(address)
+    with _GEOCODE_DB_LOCK, shelve.open(db_path) as db:
+        db[address] = point
+    return point
+
+
+@_memoize
 def from_address(
     address: Address,
     dist: int = 1000,
@@ -28,17 +216,37 @@ def from_address(
         dist: Distance in meters to search from the address
 
     Returns:
-        A NetworkX MultiDiGraph representing the street network (projected to UTM)
+        A NetworkX MultiDiGraph representing the street network, in lat/lon
+        (see `maps.projection.project`)
     """
-    G = ox.graph_from_address(
-        address,
-        dist=dist,
-        **kwargs,
-    )
-    assert isinstance(G, MultiDiGraph)
-    return ox.project_graph(G)
+    return from_point(geocode(address), dist=dist, **kwargs)
 
 
+@_memoize
+def from_address_tiled(
+    address: Address,
+    dist: int = 1000,
+    tile_m: int = TILE_METERS,
+    **kwargs: Unpack[GraphFromAddressOptions],
+) -> MultiDiGraph:
+    """Generate a street network graph from an address, downloading it in tiles.
+
+    See `from_point_tiled`.
+
+    Args:
+        address: The address to generate the graph from
+        dist: Distance in meters to search from the address
+        tile_m: Size of the tiles in meters
+        network_type: Type of network to generate
+
+    Returns:
+        A NetworkX MultiDiGraph representing the street network, in lat/lon
+        (see `maps.projection.project`)
+    """
+    return from_point_tiled(geocode(address), dist=dist, tile_m=tile_m, **kwargs)
+
+
+@_memoize
 def from_place(
     place: Place,
     **kwargs: Unpack[GraphFromPlaceOptions],
@@ -50,12 +258,16 @@ def from_place(
         network_type: Type of network to generate
 
     Returns:
-        A NetworkX MultiDiGraph representing the street network (projected to UTM)
+        A NetworkX MultiDiGraph representing the street network, in lat/lon
+        (see `maps.projection.project`)
     """
-    G = ox.graph_from_place(place, **kwargs)
-    return ox.project_graph(G)
+    from maps.schemas import PLACE_OPTIONS_ADAPTER
+
+    kwargs = PLACE_OPTIONS_ADAPTER.validate_python(kwargs)
+    return _with_overpass_slot(ox.graph_from_place, place, **kwargs)
 
 
+@_memoize
 def from_point(
     point: Point,
     dist: int = 1000,
@@ -69,7 +281,217 @@ def from_point(
         network_type: Type of network to generate
 
     Returns:
-        A NetworkX MultiDiGraph representing the street network (projected to UTM)
+        A NetworkX MultiDiGraph representing the street network, in lat/lon
+        (see `maps.projection.project`)
+    """
+    from maps.schemas import POINT_OPTIONS_ADAPTER
+
+    kwargs = POINT_OPTIONS_ADAPTER.validate_python(kwargs)
+    return _with_overpass_slot(ox.graph_from_point, point, dist=dist, **kwargs)
+
+
+@_memoize
+def from_point_tiled(
+    point: Point,
+    dist: int = 1000,
+    tile_m: int = TILE_METERS,
+    **kwargs: Unpack[GraphFromPointOptions],
+) -> MultiDiGraph:
+    """Generate a street network graph from a lat/lon point, downloading it in tiles.
+
+    The bounding box around the point is covered with tiles from a grid shared
+    by all requests, which are fetched concurrently (and cached individually
+    in osmnx's http cache) and composed into a single graph. This is much faster than one large
+    overpass query for big values of `dist`, and maps that overlap reuse each
+    other's tiles.
+
+    Args:
+        point: (latitude, longitude) tuple
+        dist: Distance in meters to search from the point
+        tile_m: Size of the tiles in meters
+        network_type: Type of network to generate
+
+    Returns:
+        A NetworkX MultiDiGraph representing the street network, in lat/lon
+        (see `maps.projection.project`)
+    """
+    from maps.schemas import POINT_OPTIONS_ADAPTER
+
+    kwargs = POINT_OPTIONS_ADAPTER.validate_python(kwargs)
+    truncate_by_edge = kwargs.pop("truncate_by_edge", False)
+    retain_all = kwargs.pop("retain_all", False)
+
+    bbox = ox.utils_geo.bbox_from_point(point, dist=dist)
+    tiles = _tiles_covering(bbox, tile_m)
+
+    def fetch(tile: tuple[int, int]) -> MultiDiGraph:
+        # keep edges and fragments that cross tile borders so the seams don't
+        # show, the caller's options are applied to the composed graph instead
+        return _tile(*tile, tile_m, retain_all=True, truncate_by_edge=True, **kwargs)
+
+    with ThreadPoolExecutor(max_workers=min(len(tiles), 16)) as executor:
+        graphs = [G for G in executor.map(fetch, tiles) if len(G)]
+
+    if not graphs:
+        raise InsufficientResponseError(f"No graph nodes found around {point!r}")
+    # nodes are keyed by osmid, so ones shared by neighbouring tiles are merged
+    G = ox.truncate.truncate_graph_bbox(
+        nx.compose_all(graphs), bbox, truncate_by_edge=truncate_by_edge
+    )
+    return G if retain_all else ox.truncate.largest_component(G)
+
+
+def from_points(
+    points: Sequence[Point],
+    dist: int = 1000,
+    max_workers: int = 4,
+    **kwargs: Unpack[GraphFromPointOptions],
+) -> list[MultiDiGraph]:
+    """Generate street network graphs for many lat/lon points concurrently.
+
+    Downloads are network-bound, so threads give a near-linear speedup up to
+    the number of overpass slots, which caps how many run at once.
+
+    Args:
+        points: (latitude, longitude) tuples
+        dist: Distance in meters to search from each point
+        max_workers: Number of threads to download with
+        network_type: Type of network to generate
+
+    Returns:
+        A graph for each point, in the same order as `points`
+    """
+
+    def fetch(point: Point) -> MultiDiGraph:
+        return from_point(point, dist=dist, **kwargs)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(fetch, points))
+
+
+def _tiles_covering(
+    bbox: tuple[float, float, float, float], tile_m: int
+) -> list[tuple[int, int]]:
+    left, bottom, right, top = bbox
+    height = tile_m / METERS_PER_DEGREE
+    tiles = []
+    for row in range(math.floor(bottom / height), math.floor(top / height) + 1):
+        width = _tile_width(row, height)
+        cols = range(math.floor(left / width), math.floor(right / width) + 1)
+        tiles.extend((row, col) for col in cols)
+    return tiles
+
+
+def _tile_width(row: int, height: float) -> float:
+    # a row's tiles are `tile_m` wide along its center line
+    return height / math.cos(math.radians((row + 0.5) * height))
+
+
+def _tile(row: int, col: int, tile_m: int, **kwargs: Any) -> MultiDiGraph:
+    height = tile_m / METERS_PER_DEGREE
+    width = _tile_width(row, height)
+    bbox = (col * width, row * height, (col + 1) * width, (row + 1) * height)
+    try:
+        return _with_overpass_slot(ox.graph_from_bbox, bbox, **kwargs)
+    except InsufficientResponseError:  # e.g. a tile that is entirely water
+        return MultiDiGraph()
+
+
+def graph_to_soa(G: MultiDiGraph) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Pull the node ids and coordinates of a graph out into arrays.
+
+    Walking `G.nodes(data=True)` chases one dict per node, this does it once
+    and caches the result for the lifetime of the graph.
+
+    Args:
+        G: The graph to extract coordinates from
+
+    Returns:
+        int64 node ids and float64 x and y coordinates, in `G.nodes` order
+    """
+    if (coords := _NODE_COORDS_CACHE.get(G)) is not None:
+        return coords
+
+    n = G.number_of_nodes()
+    osmids = np.fromiter(G.nodes, dtype=np.int64, count=n)
+    x = np.fromiter((x for _, x in G.nodes(data="x")), dtype=np.float64, count=n)
+    y = np.fromiter((y for _, y in G.nodes(data="y")), dtype=np.float64, count=n)
+    coords = _NODE_COORDS_CACHE[G] = osmids, x, y
+    return coords
+
+
+def to_soa(G: MultiDiGraph) -> dict[str, np.ndarray]:
+    """Flatten the drawable geometry of a graph into plain arrays.
+
+    Vertices are the graph's nodes (in `G.nodes` order) followed by the interior
+    vertices of any edge geometries, and every drawable line segment is a pair
+    of indices into them.
+
+    Coordinates are float32 offsets from the (float64) center of the nodes,
+    float32 alone would round UTM northings in the millions of meters to within
+    half a meter, which shows at 300 dpi. Unprojected graphs get their x offsets
+    scaled by the cosine of the center latitude, an equirectangular projection
+    that is all a rendered map needs, so x and y always share a scale. The
+    result is cached for the lifetime of the graph.
+
+    Args:
+        G: The graph to flatten
+
+    Returns:
+        Dict with `node_x`/`node_y` vertex coordinates relative to `origin`
+        and `edge_u`/`edge_v` segment endpoint indices
+    """
+    if (soa := _SOA_CACHE.get(G)) is not None:
+        return soa
+
+    position = {node: i for i, node in enumerate(G.nodes)}
+    n = len(position)
+    _, x, y = graph_to_soa(G)
+
+    u, v, geometries = [], [], []
+    for start, end, geometry in G.edges(data="geometry"):
+        if geometry is None:
+            u.append(position[start])
+            v.append(position[end])
+        else:
+            geometries.append(geometry)
+
+    # geometry vertices go after the nodes, consecutive ones of an edge are joined
+    coords, index = shapely.get_coordinates(geometries, return_index=True)
+    bend_u = n + np.flatnonzero(index[1:] == index[:-1])
+
+    origin = np.array([x.min() + x.max(), y.min() + y.max()]) / 2 if n else np.zeros(2)
+    x_scale = 1.0
+    if not ox.projection.is_projected(G.graph["crs"]):
+        x_scale = math.cos(math.radians(origin[1]))
+
+    xs = (np.concatenate([x, coords[:, 0]]) - origin[0]) * x_scale
+    ys = np.concatenate([y, coords[:, 1]]) - origin[1]
+    soa = {
+        "origin": origin,
+        "node_x": xs.astype(np.float32),
+        "node_y": ys.astype(np.float32),
+        "edge_u": np.concatenate([u, bend_u]).astype(np.int32),
+        "edge_v": np.concatenate([v, bend_u + 1]).astype(np.int32),
+    }
+    _SOA_CACHE[G] = soa
+    return soa
+
+
+def edges_xy(G: MultiDiGraph) -> np.ndarray:
+    """Return the line segments that make up the edges of a graph.
+
+    Edges with a `geometry` (e.g. curved roads after simplification) contribute
+    one segment per pair of consecutive vertices, the rest are straight lines
+    between their endpoints.
+
+    Args:
+        G: The graph to extract segments from
+
+    Returns:
+        (n_segments, 2, 2) float32 array of ((x0, y0), (x1, y1)) segments,
+        in the display frame of `to_soa`
     """
-    G = ox.graph_from_point(point, dist=dist, **kwargs)
-    return ox.project_graph(G)
+    soa = to_soa(G)
+    xy = np.column_stack([soa["node_x"], soa["node_y"]])
+    return np.stack([xy[soa["edge_u"]], xy[soa["edge_v"]]], axis=1)
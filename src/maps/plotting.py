@@ -0,0 +1,238 @@
+"""Plotting helpers for street network figures."""
+
+import functools
+import threading
+from collections.abc import Sequence
+from typing import Any, Unpack
+
+import numpy as np
+from matplotlib.axes import Axes
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.collections import LineCollection, PathCollection
+from matplotlib.figure import Figure
+from matplotlib.transforms import Bbox
+from networkx import MultiDiGraph
+from numpy.typing import ArrayLike
+from PIL import Image
+
+from maps import generators
+from maps.types import PlotOptions
+
+RASTERIZE_MIN_EDGES = 5000
+
+
+def rasterize_edges(
+    ax: Axes,
+    G: MultiDiGraph,
+    min_edges: int = RASTERIZE_MIN_EDGES,
+) -> None:
+    """Rasterize the street network artists of a plotted graph.
+
+    Dense networks produce tens of thousands of line segments, rasterizing them
+    keeps saving cheap while the rest of the figure stays vector.
+
+    Args:
+        ax: Axes the graph was plotted on
+        G: The plotted graph
+        min_edges: Graphs with this many edges or fewer are left as vectors
+    """
+    rasterized = len(G.edges) > min_edges
+    for artist in [*ax.collections, *ax.lines]:
+        artist.set_rasterized(rasterized)
+
+
+def axes_extent(fig: Figure) -> Bbox:
+    """Return the extent of a figure's axes in inches.
+
+    Passing this as `bbox_inches` to `savefig` crops the figure to the map like
+    `bbox_inches="tight"` does, without the extra draw needed to measure it.
+
+    Args:
+        fig: Figure holding the plotted graph
+
+    Returns:
+        Bounding box of the (aspect-adjusted) axes, in inches
+    """
+    for ax in fig.axes:
+        ax.apply_aspect()
+    return Bbox.union([ax.bbox for ax in fig.axes]).transformed(
+        fig.dpi_scale_trans.inverted()
+    )
+
+
+def render_image(fig: Figure, dpi: float) -> Image.Image:
+    """Draw a figure once with Agg and return it cropped to its axes.
+
+    Args:
+        fig: Figure holding the plotted graph
+        dpi: Resolution to render at
+
+    Returns:
+        The rendered RGBA image
+    """
+    fig.set_dpi(dpi)
+    canvas = fig.canvas
+    if not isinstance(canvas, FigureCanvasAgg):
+        canvas = FigureCanvasAgg(fig)
+    canvas.draw()
+    image = Image.frombuffer(
+        "RGBA", canvas.get_width_height(), canvas.buffer_rgba(), "raw", "RGBA", 0, 1
+    )
+
+    # matplotlib measures from the bottom left, pillow from the top left
+    left, bottom, right, top = axes_extent(fig).extents * dpi
+    box = (left, image.height - top, right, image.height - bottom)
+    return image.crop(tuple(round(edge) for edge in box))
+
+
+def plot_graph(
+    G: MultiDiGraph,
+    **kwargs: Unpack[PlotOptions],
+) -> tuple[Figure, Axes]:
+    """Plot a street network on a figure that pyplot doesn't know about.
+
+    Figures created through pyplot live in its global registry until closed,
+    so a long-running process leaks one per plot. These are plain Agg figures
+    that are garbage collected like anything else. Edges are drawn as a single
+    `LineCollection` built from an array of segments rather than through
+    `ox.plot_graph`, but the defaults and framing match it.
+
+    Args:
+        G: The graph to plot
+        **kwargs: Plot options, see `PlotOptions`
+
+    Returns:
+        The figure and axes the graph was plotted on
+    """
+    fig, ax = _new_figure(**kwargs)
+    _draw_graph(ax, G, **kwargs)
+    return fig, ax
+
+
+class Renderer:
+    """Renders graphs with a fixed set of plot options onto one reusable figure.
+
+    The edge and node artists are created once and only have their data swapped
+    on each render, so the per-call cost is little more than the Agg draw. Get
+    instances through `renderer`, which caches one per set of options.
+    """
+
+    def __init__(self, **kwargs: Unpack[PlotOptions]) -> None:
+        self.fig, self.ax = _new_figure(**kwargs)
+        self._edges = _edge_collection(np.empty((0, 2, 2)), **kwargs)
+        self.ax.add_collection(self._edges)
+        self._node_size = kwargs.get("node_size", 15)
+        self._nodes = None
+        if _draws_nodes(self._node_size):
+            # a list of sizes has to match the nodes, so sizes are set per render
+            self._nodes = _node_scatter(self.ax, [], [], 1)
+        self._lock = threading.Lock()
+
+    def render(self, G: MultiDiGraph, dpi: float = 300) -> Image.Image:
+        """Render a graph to an image, see `render_image`."""
+        segments = generators.edges_xy(G)
+        soa, n = generators.to_soa(G), G.number_of_nodes()
+        with self._lock:
+            self._edges.set_segments(segments)
+            if self._nodes is not None:
+                self._nodes.set_offsets(
+                    np.column_stack([soa["node_x"][:n], soa["node_y"][:n]])
+                )
+                self._nodes.set_sizes(np.atleast_1d(self._node_size))
+            _set_view(self.ax, segments)
+            rasterize_edges(self.ax, G)
+            return render_image(self.fig, dpi)
+
+
+def renderer(**kwargs: Unpack[PlotOptions]) -> Renderer:
+    """Get the shared renderer for a set of plot options.
+
+    Args:
+        **kwargs: Plot options, see `PlotOptions`. `dpi` is ignored, it is
+            chosen per render.
+
+    Returns:
+        A renderer that is reused across calls with the same options
+    """
+    options = {k: tuple(v) if isinstance(v, list) else v for k, v in kwargs.items()}
+    options.pop("dpi", None)
+    return _renderer(tuple(sorted(options.items())))
+
+
+@functools.lru_cache(maxsize=16)
+def _renderer(options: tuple[tuple[str, Any], ...]) -> Renderer:
+    return Renderer(**dict(options))
+
+
+def _new_figure(**kwargs: Unpack[PlotOptions]) -> tuple[Figure, Axes]:
+    bgcolor = kwargs.get("bgcolor", "#111111")
+    fig = Figure(
+        figsize=kwargs.get("figsize", (8, 8)), facecolor=bgcolor, frameon=False
+    )
+    FigureCanvasAgg(fig)
+    ax = fig.add_subplot()
+    ax.set_facecolor(bgcolor)
+
+    # hide the axis lines without set_axis_off, which would also hide the bgcolor
+    ax.margins(0)
+    for spine in ax.spines.values():
+        spine.set_visible(False)
+    ax.xaxis.set_visible(False)
+    ax.yaxis.set_visible(False)
+    return fig, ax
+
+
+def _edge_collection(
+    segments: np.ndarray, **kwargs: Unpack[PlotOptions]
+) -> LineCollection:
+    return LineCollection(
+        segments,
+        colors=kwargs.get("edge_color", "#999999"),
+        linewidths=kwargs.get("edge_linewidth", 1),
+        zorder=1,
+    )
+
+
+def _draws_nodes(node_size: float | Sequence[float]) -> bool:
+    return bool(np.any(np.asarray(node_size) > 0))
+
+
+def _node_scatter(
+    ax: Axes, xs: ArrayLike, ys: ArrayLike, node_size: float | Sequence[float]
+) -> PathCollection:
+    return ax.scatter(xs, ys, s=node_size, c="w", edgecolors="none", zorder=1)
+
+
+def _draw_graph(ax: Axes, G: MultiDiGraph, **kwargs: Unpack[PlotOptions]) -> None:
+    segments = generators.edges_xy(G)
+    ax.add_collection(_edge_collection(segments, **kwargs))
+
+    if _draws_nodes(node_size := kwargs.get("node_size", 15)):
+        soa, n = generators.to_soa(G), G.number_of_nodes()
+        _node_scatter(ax, soa["node_x"][:n], soa["node_y"][:n], node_size)
+
+    _set_view(ax, segments)
+    rasterize_edges(ax, G)
+
+
+def view(segments: np.ndarray) -> tuple[float, float, float, float]:
+    """Compute the view that shows segments with the same padding as osmnx.
+
+    Args:
+        segments: (n_segments, 2, 2) array of segments, see `generators.edges_xy`
+
+    Returns:
+        (left, bottom, right, top) bounds
+    """
+    left, bottom = segments.min(axis=(0, 1))
+    right, top = segments.max(axis=(0, 1))
+    pad_x, pad_y = (right - left) * 0.02, (top - bottom) * 0.02
+    return left - pad_x, bottom - pad_y, right + pad_x, top + pad_y
+
+
+def _set_view(ax: Axes, segments: np.ndarray) -> None:
+    # x and y share a scale in the display frame, even for lat/lon graphs
+    left, bottom, right, top = view(segments)
+    ax.set_xlim(left, right)
+    ax.set_ylim(bottom, top)
+    ax.set_aspect(1)
@@ -0,0 +1,112 @@
+"""Projecting street network graphs out of lat/lon."""
+
+import functools
+import weakref
+from collections.abc import Callable
+from typing import Any
+
+import numpy as np
+import osmnx as ox
+import pyproj
+import shapely
+from networkx import MultiDiGraph
+
+from maps.generators import graph_to_soa
+
+# below this, copying coordinates to the GPU costs more than projecting on the CPU
+GPU_PROJECTION_MIN_NODES = 100_000
+
+_PROJECTED: weakref.WeakKeyDictionary[MultiDiGraph, dict[str, MultiDiGraph]] = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def project(G: MultiDiGraph, crs: str = "utm") -> MultiDiGraph:
+    """Project a graph, e.g. to measure distances on it.
+
+    Mirrors `ox.project_graph` (edge geometries are projected too and the
+    graph's crs updated, lat/lon graphs keep their original coordinates as
+    `lon`/`lat`) but hands PROJ whole coordinate arrays instead of going
+    through geopandas. Graphs are projected from whatever crs they are in.
+    Large lat/lon graphs are projected to UTM on the GPU if cuproj is installed.
+
+    Graphs from `maps.generators` are shared between callers, so this projects
+    a copy, which is cached for the lifetime of `G`. Plotting doesn't need a
+    projected graph, see `generators.to_soa`.
+
+    Args:
+        G: The graph to project
+        crs: CRS to project to, "utm" picks the UTM zone of the graph's center
+
+    Returns:
+        The projected copy of `G`
+    """
+    projected = _PROJECTED.setdefault(G, {})
+    if (H := projected.get(crs)) is None:
+        H = projected[crs] = _project(G, crs)
+    return H
+
+
+def _project(G: MultiDiGraph, crs: str) -> MultiDiGraph:
+    _, xs, ys = graph_to_soa(G)
+    from_crs = G.graph["crs"]
+    is_latlon = not ox.projection.is_projected(from_crs)
+
+    transform = None
+    if crs == "utm":
+        lon, lat = _transformer(from_crs, ox.settings.default_crs).transform(
+            xs.mean(), ys.mean()
+        )
+        zone, north = int((lon + 180) // 6) + 1, bool(lat >= 0)
+        crs = _utm_crs(zone, north)
+        if is_latlon and len(xs) >= GPU_PROJECTION_MIN_NODES:
+            transform = _gpu_transform(crs)
+    if transform is None:
+        transform = _transformer(from_crs, crs).transform
+
+    H = G.copy()
+    for (_, data), x, y in zip(H.nodes(data=True), *transform(xs, ys), strict=True):
+        if is_latlon:
+            data["lon"], data["lat"] = data["x"], data["y"]
+        data["x"], data["y"] = x, y
+
+    edges = [data for _, _, data in H.edges(data=True) if "geometry" in data]
+    geometries = shapely.transform(
+        [data["geometry"] for data in edges],
+        lambda coords: np.column_stack(transform(coords[:, 0], coords[:, 1])),
+    )
+    for data, geometry in zip(edges, geometries, strict=True):
+        data["geometry"] = geometry
+
+    H.graph["crs"] = crs
+    return H
+
+
+def _utm_crs(zone: int, north: bool) -> str:
+    return f"EPSG:{(32600 if north else 32700) + zone}"
+
+
+@functools.lru_cache(maxsize=128)
+def _transformer(from_crs: Any, to_crs: Any) -> pyproj.Transformer:
+    # building a transformer initializes a PROJ pipeline, nearby maps share a zone
+    return pyproj.Transformer.from_crs(from_crs, to_crs, always_xy=True)
+
+
+def _gpu_transform(
+    utm_crs: str,
+) -> Callable[[np.ndarray, np.ndarray], tuple[np.ndarray, np.ndarray]] | None:
+    # optional, and cupy sets up CUDA on import, so only try once a graph is big
+    try:
+        import cupy as cp
+        from cuproj import Transformer as GPUTransformer
+    except ImportError:
+        return None
+
+    transformer = GPUTransformer.from_crs(ox.settings.default_crs, utm_crs)
+
+    def transform(lon: np.ndarray, lat: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        # unlike pyproj, cuproj has no always_xy and EPSG:4326 is latitude first
+        x, y = transformer.transform(cp.asarray(lat), cp.asarray(lon))
+        return cp.asnumpy(x), cp.asnumpy(y)
+
+    return transform
@@ -0,0 +1,144 @@
+"""Pydantic-annotated versions of `maps.types` for MCP tool schemas and validation."""
+
+from collections.abc import Sequence
+from typing import Annotated, NotRequired
+
+from pydantic import ConfigDict, Field, TypeAdapter, with_config
+from typing_extensions import TypedDict
+
+from maps.types import NetworkType
+
+Address = Annotated[
+    str,
+    Field(
+        description="Address to generate the map from",
+        examples=["123 Main St, Anytown, USA"],
+    ),
+]
+
+Place = Annotated[
+    str | dict[str, str] | list[str | dict[str, str]],
+    Field(
+        description="Place to generate the map from",
+        examples=["Anytown, USA", {"city": "Anytown", "state": "USA"}],
+    ),
+]
+
+Point = Annotated[
+    tuple[float, float],
+    Field(
+        description="Point to generate the map from",
+        examples=[(37.774929, -122.419418)],
+    ),
+]
+
+Distance = Annotated[
+    int,
+    Field(
+        description="Distance in meters to search from the center of the map",
+        examples=[1000],
+    ),
+]
+
+OutputImageLocation = Annotated[
+    str, Field(description="Path to save the output image", examples=["img/map.png"])
+]
+
+
+class PlotOptions(TypedDict):
+    figsize: NotRequired[
+        Annotated[tuple[float, float], Field(description="Size of the figure")]
+    ]
+    node_size: NotRequired[
+        Annotated[
+            float | Sequence[float],
+            Field(
+                description="Size of the nodes or list of sizes, defaults to 15",
+                examples=[15, [15, 20]],
+            ),
+        ]
+    ]
+    dpi: NotRequired[
+        Annotated[int, Field(description="Resolution of the output image")]
+    ]
+    edge_linewidth: NotRequired[
+        Annotated[float, Field(description="Width of the edges")]
+    ]
+    bgcolor: NotRequired[
+        Annotated[
+            str,
+            Field(
+                description="(hex) Background color", examples=["#ffffff", "#000000"]
+            ),
+        ]
+    ]
+    edge_color: NotRequired[
+        Annotated[
+            str,
+            Field(
+                description="(hex) Color of the edges", examples=["#ffffff", "#000000"]
+            ),
+        ]
+    ]
+
+
+# options are splatted into osmnx, reject typos instead of silently dropping them
+_FROM_OPTIONS_CONFIG = ConfigDict(extra="forbid")
+
+
+@with_config(_FROM_OPTIONS_CONFIG)
+class _BaseFromOptions(TypedDict):
+    network_type: NotRequired[
+        Annotated[
+            NetworkType,
+            Field(description="Type of network to generate, defaults to 'street'"),
+        ]
+    ]
+    simplify: NotRequired[
+        Annotated[
+            bool, Field(description="Whether to simplify the graph, defaults to True")
+        ]
+    ]
+    retain_all: NotRequired[
+        Annotated[
+            bool, Field(description="Whether to retain all nodes, defaults to False")
+        ]
+    ]
+    truncate_by_edge: NotRequired[
+        Annotated[
+            bool,
+            Field(
+                description="Whether to truncate the graph by edge, defaults to False"
+            ),
+        ]
+    ]
+    custom_filter: NotRequired[
+        Annotated[
+            str | list[str] | None,
+            Field(description="Custom filter to use, defaults to None"),
+        ]
+    ]
+
+
+@with_config(_FROM_OPTIONS_CONFIG)
+class GraphFromAddressOptions(_BaseFromOptions): ...
+
+
+@with_config(_FROM_OPTIONS_CONFIG)
+class GraphFromPlaceOptions(_BaseFromOptions):
+    which_result: NotRequired[
+        Annotated[
+            int | None | list[int | None],
+            Field(description="Which result to use, defaults to None"),
+        ]
+    ]
+
+
+@with_config(_FROM_OPTIONS_CONFIG)
+class GraphFromPointOptions(_BaseFromOptions): ...
+
+
+# building a validator reflects over all the annotations above, so do it once.
+# address options are validated as point options once the address is geocoded
+PLACE_OPTIONS_ADAPTER = TypeAdapter(GraphFromPlaceOptions)
+POINT_OPTIONS_ADAPTER = TypeAdapter(GraphFromPointOptions)
@@ -1,12 +1,63 @@
 """Storage utilities for map images."""
 
-import io
-from datetime import datetime
-from typing import Any
+import functools
+import os
+import tempfile
+import time
+from typing import IO, TYPE_CHECKING, Any, NamedTuple
 
-import boto3
-import matplotlib.figure as mpl_fig
-from botocore.config import Config
+# boto3 and matplotlib take seconds to import, only load them once they're used
+if TYPE_CHECKING:
+    import matplotlib.figure as mpl_fig
+    from PIL import Image
+
+SPOOL_MAX_SIZE = 8 << 20
+# below this a single PutObject beats the transfer manager's multipart machinery
+PUT_OBJECT_MAX_SIZE = 5 << 20
+
+
+class ImageFormat(NamedTuple):
+    pil_format: str
+    save_options: dict[str, Any]
+    content_type: str
+    extension: str
+
+
+# maps are mostly flat background with sparse edges, so the cheapest encoder
+# settings lose little in size
+IMAGE_FORMATS = {
+    "webp": ImageFormat("WEBP", {"quality": 85, "method": 4}, "image/webp", "webp"),
+    "webp-lossless": ImageFormat(
+        "WEBP", {"lossless": True, "method": 0}, "image/webp", "webp"
+    ),
+    "png": ImageFormat(
+        "PNG", {"compress_level": 1, "optimize": False}, "image/png", "png"
+    ),
+}
+
+
+@functools.lru_cache(maxsize=8)
+def _make_client(
+    endpoint_url: str, region_name: str, credentials: tuple[tuple[str, Any], ...]
+) -> Any:
+    import boto3
+    from botocore.config import Config
+
+    # clients are thread safe, sharing one keeps its pooled (keep-alive)
+    # connections warm across buckets instead of handshaking again per instance
+    return boto3.client(
+        "s3",
+        endpoint_url=endpoint_url,
+        region_name=region_name,
+        config=Config(
+            request_checksum_calculation="WHEN_REQUIRED",
+            response_checksum_validation="WHEN_REQUIRED",
+            max_pool_connections=32,
+            tcp_keepalive=True,
+            retries={"mode": "adaptive", "total_max_attempts": 5},
+        ),
+        **dict(credentials),
+    )
 
 
 class R2Bucket:
@@ -17,6 +68,7 @@ class R2Bucket:
         bucket_name: str,
         endpoint_url: str,
         region_name: str = "auto",
+        image_format: str | None = None,
         **credentials: Any,
     ) -> None:
         """Initialize R2 storage client.
@@ -25,54 +77,120 @@ class R2Bucket:
             bucket: R2 bucket name
             endpoint_url: R2 endpoint URL
             region_name: R2 region name
+            image_format: One of `IMAGE_FORMATS`, defaults to $MAPS_IMAGE_FORMAT
+                or "webp"
             **credentials: AWS credentials (access_key_id, secret_access_key)
         """
+        image_format = image_format or os.environ.get("MAPS_IMAGE_FORMAT", "webp")
+        if image_format not in IMAGE_FORMATS:
+            raise ValueError(
+                f"Unknown image format {image_format!r}, "
+                f"expected one of {list(IMAGE_FORMATS)}"
+            )
+        self.image_format = IMAGE_FORMATS[image_format]
         self.bucket_name = bucket_name
-        self.client = boto3.client(
-            "s3",
-            endpoint_url=endpoint_url,
-            region_name=region_name,
-            config=Config(
-                request_checksum_calculation="WHEN_REQUIRED",
-                response_checksum_validation="WHEN_REQUIRED",
-            ),
-            **credentials,
+        self.client = _make_client(
+            endpoint_url, region_name, tuple(sorted(credentials.items()))
         )
 
     def upload_fileobj(
         self,
-        fileobj: io.BytesIO,
+        fileobj: IO[bytes],
         key: str,
+        content_type: str = "image/png",
     ) -> None:
         """Upload a file object to R2."""
-        self.client.upload_fileobj(fileobj, self.bucket_name, key)
+        from boto3.s3.transfer import TransferConfig
+
+        self.client.upload_fileobj(
+            fileobj,
+            self.bucket_name,
+            key,
+            ExtraArgs={"ContentType": content_type},
+            Config=TransferConfig(multipart_chunksize=SPOOL_MAX_SIZE, use_threads=True),
+        )
+
+    def exists(self, key: str) -> bool:
+        """Check whether an object exists in R2."""
+        from botocore.exceptions import ClientError
+
+        try:
+            self.client.head_object(Bucket=self.bucket_name, Key=key)
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey"):
+                return False
+            raise
+        return True
+
+    def figure_key(self, network_type: str, namespace: str, name: str) -> str:
+        """Build the key a figure is stored under."""
+        return f"{namespace}/{network_type}_{name}.{self.image_format.extension}"
 
     def save_figure(
         self,
-        fig: mpl_fig.Figure,
+        fig: "mpl_fig.Figure",
         network_type: str,
         namespace: str,
         dpi: int = 300,
+        name: str | None = None,
     ) -> str:
         """Save matplotlib figure to R2.
 
         Args:
             fig: Matplotlib figure to save
             network_type: Type of network (for filename)
+            namespace: Prefix to store the figure under
             dpi: DPI for saved image
+            name: Name for the figure, defaults to a timestamp
 
         Returns:
             key of newly created object in R2
         """
-        # Create buffer and save figure to it
-        buf = io.BytesIO()
-        fig.savefig(buf, format="png", dpi=dpi, bbox_inches="tight")
-        buf.seek(0)
+        from maps import plotting
 
-        # Generate filename with timestamp
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        key = f"{namespace}/{network_type}_{timestamp}.png"
+        return self.save_image(
+            plotting.render_image(fig, dpi), network_type, namespace, name=name
+        )
+
+    def save_image(
+        self,
+        image: "Image.Image",
+        network_type: str,
+        namespace: str,
+        name: str | None = None,
+    ) -> str:
+        """Save a rendered map image to R2.
+
+        Args:
+            image: Image to save
+            network_type: Type of network (for filename)
+            namespace: Prefix to store the image under
+            name: Name for the image, defaults to a timestamp
+
+        Returns:
+            key of newly created object in R2
+        """
+        # Generate filename from a nanosecond timestamp unless one was given,
+        # unique across concurrent uploads and still sorted by time when listed
+        name = name or f"{time.time_ns():x}"
+        key = self.figure_key(network_type, namespace, name)
 
-        self.upload_fileobj(buf, key)
+        # Small images stay in memory, large ones spill to disk instead of
+        # holding a second copy of the map in RAM during the upload
+        with tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE) as buf:
+            fmt = self.image_format
+            image.convert("RGB").save(buf, format=fmt.pil_format, **fmt.save_options)
+            size = buf.tell()
+            buf.seek(0)
+            if size < PUT_OBJECT_MAX_SIZE:
+                self.client.put_object(
+                    Bucket=self.bucket_name,
+                    Key=key,
+                    Body=buf.read(),
+                    ContentLength=size,
+                    ContentType=fmt.content_type,
+                )
+            else:
+                self.upload_fileobj(buf, key, content_type=fmt.content_type)
 
         return key